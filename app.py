@@ -2,26 +2,75 @@
 app.py
 - Flask webhook receiver + health endpoint
 - Receives IG webhook events (messages/comments)
+- Cold start is lazy by default: responder/sender/logger (and `requests`) are imported,
+  and the DB is initialized, on the first webhook call. STARTUP_MODE=eager (or calling
+  warmup(), e.g. from a preloading server) does that work up front instead.
 """
-from dotenv import load_dotenv
-load_dotenv()
 import os
-
+from functools import partial
 
 from flask import Flask, request, jsonify
 import logging
 from auth import verify_webhook_mode, IG_VERIFY_TOKEN, DEV_MODE
 from nlu import parse_message
-from responder import generate_response
-from sender import send_instagram_message
-from logger import log_interaction
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# How long a delivered message id is remembered, so IG retries aren't answered twice
+DEDUPE_TTL = int(os.getenv("WEBHOOK_DEDUPE_TTL", "3600"))
+# How long a message id stays claimed while its reply is being produced. If the worker dies
+# mid-way the claim lapses, so IG's retry is answered instead of dropped as a duplicate.
+DEDUPE_CLAIM_TTL = int(os.getenv("WEBHOOK_DEDUPE_CLAIM_TTL", "120"))
+
+def warmup():
+    """Import the heavy modules and initialize the DB and routing table ahead of traffic."""
+    import logger
+    import routing
+    import responder
+    import scheduler
+    import sender
+    import shared_state
+    logger.init_db()
+    shared_state.init()
+    routing.get_table()
+
+def _deliver(event_id, sender_id, text, nlu_result, response_text, source):
+    """
+    Log and send one reply, then confirm its dedupe claim for DEDUPE_TTL.
+    If logging or sending fails the claim is released, so IG's retry gets answered.
+    """
+    from sender import send_instagram_message
+    from logger import log_interaction
+    import shared_state
+
+    key = f"webhook:{event_id}" if event_id else None
+    try:
+        # Log (also updates the analytics rollups)
+        log_interaction(sender_id, text, nlu_result, response_text, source=source)
+        # Send (dev-mode will simulate)
+        send_result = send_instagram_message(sender_id, response_text)
+    except Exception:
+        if key:
+            shared_state.delete(key)
+        raise
+    if key:
+        if send_result.get("status") == "failed":
+            shared_state.delete(key)
+        else:
+            shared_state.set(key, True, ttl=DEDUPE_TTL)
+    return send_result
+
+def _deliver_in_background(event_id, sender_id, text, nlu_result, response_text, source):
+    """_deliver for replies that settle after the webhook request has returned."""
+    try:
+        _deliver(event_id, sender_id, text, nlu_result, response_text, source)
+    except Exception:
+        logging.exception(f"Failed to deliver reply to {sender_id}")
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "dev_mode": DEV_MODE})
+    return jsonify({"status": "ok", "dev_mode": DEV_MODE, "pid": os.getpid()})
 
 @app.route("/webhook", methods=["GET", "POST"])
 def webhook():
@@ -36,31 +85,64 @@ def webhook():
     if not isinstance(payload, dict) or len(str(payload)) > 200000:
         return "Bad Request", 400
 
+    # Deferred imports (cached by Python after the first request)
+    from scheduler import get_scheduler
+    import shared_state
+
     # Handle IG messaging events (simplified)
     events = payload.get("entry", [])
-    responses = []
+    scheduler = get_scheduler()
+    jobs = []
     for entry in events:
         for messaging in entry.get("messaging", []):
             sender_id = messaging.get("sender", {}).get("id") or messaging.get("from", {}).get("id")
             text = None
+            event_id = None
             if "message" in messaging:
                 text = messaging["message"].get("text")
+                event_id = messaging["message"].get("mid")
             elif "comment" in messaging:
                 text = messaging["comment"].get("text")
+                event_id = messaging["comment"].get("id")
             if not text:
                 continue
+            # Retried deliveries may land on another worker, so dedupe via shared state
+            if event_id and not shared_state.add_if_absent(f"webhook:{event_id}", DEDUPE_CLAIM_TTL):
+                logging.info(f"Skipping duplicate webhook event {event_id}")
+                continue
 
-            # NLU
-            nlu_result = parse_message(text)
-            # Response
-            response_text = generate_response(text, nlu_result)
-            # Log
-            log_interaction(sender_id, text, nlu_result, response_text)
+            try:
+                # NLU
+                nlu_result = parse_message(text)
+                # Response: template replies are answered inline, LLM-bound ones on a
+                # bounded lane with a deadline (see scheduler.py)
+                job = scheduler.submit(text, nlu_result)
+            except Exception:
+                if event_id:
+                    shared_state.delete(f"webhook:{event_id}")
+                raise
+            jobs.append((event_id, sender_id, text, nlu_result, job))
 
-            # Send (dev-mode will simulate)
-            send_result = send_instagram_message(sender_id, response_text)
-            responses.append({"to": sender_id, "sent": send_result})
+    responses = []
+    for event_id, sender_id, text, nlu_result, job in jobs:
+        if not job.done():
+            # LLM-bound: log + send on the scheduler's delivery pool when the reply settles
+            # (or at its deadline), so this request thread is free for cheap replies right away.
+            # IG already got its 200, so it won't retry: gunicorn.conf.py drains these on exit.
+            scheduler.deliver_when_done(job, partial(_deliver_in_background, event_id, sender_id, text, nlu_result))
+            responses.append({"to": sender_id, "sent": {"status": "queued"}})
+            continue
+        response_text, source = job.result()
+        try:
+            send_result = _deliver(event_id, sender_id, text, nlu_result, response_text, source)
+        except Exception as e:
+            logging.exception(f"Failed to deliver reply to {sender_id}")
+            send_result = {"status": "failed", "error": str(e)}
+        responses.append({"to": sender_id, "sent": send_result})
     return jsonify({"ok": True, "responses": responses})
 
+if os.getenv("STARTUP_MODE", "lazy").lower() == "eager":
+    warmup()
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
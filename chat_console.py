@@ -4,7 +4,7 @@ A simple local test interface for your chatbot — runs inside Python only.
 """
 
 from nlu import parse_message
-from responder import generate_response
+from responder import generate_response, reply_source
 from logger import log_interaction
 
 print("\n🤖 Chatbot ready! Type your message (or 'exit' to quit)\n")
@@ -26,4 +26,4 @@ while True:
     print(f"Bot: {bot_reply}")
 
     # Log conversation (optional)
-    log_interaction("local_user", user_message, nlu_result, bot_reply)
+    log_interaction("local_user", user_message, nlu_result, bot_reply, source=reply_source(nlu_result))
@@ -0,0 +1,49 @@
+"""
+gunicorn.conf.py
+- Production settings for `gunicorn -c gunicorn.conf.py wsgi:app` (Linux/macOS; gunicorn has no Windows support).
+- Every value can be overridden from the environment:
+    WEB_CONCURRENCY   worker processes (default: 2 x CPU cores + 1)
+    GUNICORN_THREADS  threads per worker (default: 4); LLM replies are sent from scheduler.py's
+                      lane, so these threads only wait on template replies and Graph API sends
+    GUNICORN_PRELOAD  import + warm up the app once in the master before forking (default: true)
+    GUNICORN_BIND, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_MAX_REQUESTS
+- Graceful restart (e.g. after a deploy): `kill -HUP <master pid>` starts new workers and lets
+  old ones finish in-flight requests within graceful_timeout. With preload enabled, code changes
+  need a full restart (or `kill -USR2` for a zero-downtime binary upgrade).
+- LLM replies are acknowledged to Instagram ("queued") before they are sent, so IG never retries
+  them. worker_exit drains each worker's reply scheduler (within graceful_timeout) on HUP,
+  max_requests recycling or SIGTERM; replies still pending after that, or lost to a hard kill
+  (SIGKILL, OOM, worker timeout), are not sent.
+- Cross-worker state (webhook dedupe, rate-limit cool-down) lives in shared_state.py, not in globals.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:" + os.getenv("PORT", "5000"))
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+
+def when_ready(server):
+    # With preload_app the app is already imported here; warm it up once so forked
+    # workers inherit the loaded modules and routing table instead of each paying for it.
+    if preload_app:
+        from app import warmup
+        warmup()
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker once it stops accepting requests: finish queued LLM replies,
+    # leaving a little of graceful_timeout for the process to exit before the master kills it.
+    import scheduler
+    if not scheduler.drain(max(1, graceful_timeout - 2)):
+        worker.log.warning("Worker exiting with LLM replies still queued; they will not be sent")
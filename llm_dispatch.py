@@ -0,0 +1,119 @@
+"""
+llm_dispatch.py
+- Micro-batching dispatcher for LLM calls (used by responder._call_llm).
+- Prompts submitted within a short window (LLM_BATCH_WINDOW_MS) are collected and issued
+  together on a bounded pool (LLM_MAX_CONCURRENCY), capping concurrent upstream load in spikes.
+- Single-flight: identical prompts already pending or in flight share one upstream call;
+  every caller gets the same Future.
+- Callers may pass a timeout: the call gets the time left as its own timeout, and a prompt
+  whose time ran out while waiting for a slot fails with TimeoutError without going upstream.
+- Per process and created on first use; background threads never cross a fork.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "5"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+
+class LLMDispatcher:
+    """
+    Collects prompts for `window_ms`, de-duplicates them and runs `call(prompt, timeout)` for
+    each distinct prompt with at most `max_concurrency` calls at once. `timeout` is the time
+    left in seconds, or None when no caller set one.
+    """
+
+    def __init__(self, call, window_ms: float = BATCH_WINDOW_MS, max_concurrency: int = MAX_CONCURRENCY):
+        self._call = call
+        self._window = max(0.0, window_ms) / 1000.0
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-dispatch")
+        self._cond = threading.Condition()
+        self._inflight = {}  # prompt -> Future shared by every caller of that prompt
+        self._pending = []   # prompts collected in the current window
+        self._deadlines = {}  # prompt -> monotonic deadline (None: no limit), until its call starts
+        self._flusher = None
+        self.stats = {"submitted": 0, "deduplicated": 0, "upstream_calls": 0, "expired": 0}
+
+    def submit(self, prompt: str, timeout: float = None) -> Future:
+        """
+        Queue `prompt` (or join an identical one in flight) and return its Future.
+        With a timeout, the call is skipped (TimeoutError) if no slot frees up in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self.stats["submitted"] += 1
+            future = self._inflight.get(prompt)
+            if future is not None:
+                self.stats["deduplicated"] += 1
+                if prompt in self._deadlines:
+                    # Not started yet: keep it alive for the most patient caller
+                    current = self._deadlines[prompt]
+                    self._deadlines[prompt] = None if None in (current, deadline) else max(current, deadline)
+                return future
+            future = Future()
+            self._inflight[prompt] = future
+            self._deadlines[prompt] = deadline
+            self._pending.append(prompt)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="llm-dispatch-flusher", daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+        return future
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let prompts arriving in the same window join this batch
+            if self._window:
+                time.sleep(self._window)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            for prompt in batch:
+                self._pool.submit(self._run, prompt)
+
+    def _run(self, prompt: str):
+        with self._cond:
+            deadline = self._deadlines.pop(prompt)
+            timeout = None if deadline is None else deadline - time.monotonic()
+            expired = timeout is not None and timeout <= 0
+            self.stats["expired" if expired else "upstream_calls"] += 1
+        if expired:
+            result, error = None, TimeoutError("timed out waiting for a free request slot")
+        else:
+            try:
+                result, error = self._call(prompt, timeout), None
+            except Exception as e:
+                result, error = None, e
+        with self._cond:
+            future = self._inflight.pop(prompt)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+_dispatcher = None
+_dispatcher_pid = None
+_lock = threading.Lock()
+
+
+def get_dispatcher(call) -> LLMDispatcher:
+    """
+    Return this process's dispatcher, creating it around `call` on first use.
+    There is one dispatcher per process, so every caller must pass the same `call`.
+    """
+    global _dispatcher, _dispatcher_pid
+    if _dispatcher is None or _dispatcher_pid != os.getpid():
+        with _lock:
+            if _dispatcher is None or _dispatcher_pid != os.getpid():
+                _dispatcher, _dispatcher_pid = LLMDispatcher(call), os.getpid()
+    if _dispatcher._call is not call:
+        raise ValueError(
+            f"LLM dispatcher already runs {_dispatcher._call.__name__}; cannot reuse it for {call.__name__}"
+        )
+    return _dispatcher
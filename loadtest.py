@@ -0,0 +1,368 @@
+"""
+loadtest.py
+- Reproducible load generator for the /webhook endpoint, built on run_local.simulate_message.
+- Replays a corpus (JSONL of messages or a CSV exported with logger.export_history_csv).
+- Drives the webhook at a fixed concurrency (closed loop) or a target rate (open loop).
+- Optional local stub servers stand in for OpenRouter and the Instagram Graph API,
+  with configurable latency and error injection, so runs never touch the real services.
+- Reports throughput and latency percentiles. HTTP latency covers template replies and the
+  "queued" acknowledgement of LLM replies; with --spawn the run waits for queued replies to be
+  delivered and reports their count and end-to-end latency separately.
+
+Examples:
+    python loadtest.py --corpus corpus.jsonl --spawn --concurrency 8 --requests 500
+    python loadtest.py --corpus export.csv --spawn --rate 50 --duration 30 \\
+        --stub-latency-ms 300 --stub-error-rate 0.05
+    python loadtest.py --corpus corpus.jsonl --url http://127.0.0.1:5000/webhook --concurrency 4
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from run_local import WEBHOOK_URL, simulate_message
+
+# Keys tried (in order) when reading a message text / sender id from a JSONL line
+TEXT_KEYS = ("text", "message", "body", "title")
+SENDER_KEYS = ("sender_id", "session_id", "user")
+
+# How long a spawned app gets to deliver queued LLM replies before it is stopped
+DRAIN_TIMEOUT = 60.0
+
+
+# ==========================
+# CORPUS
+# ==========================
+def load_corpus(path: str, users: int = 50, seed: int = 0):
+    """
+    Load (sender_id, text) pairs from a .jsonl or exported .csv file.
+    Lines without a sender id are spread deterministically over `users` fake users.
+    """
+    rng = random.Random(seed)
+    items = []
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("role", "user") == "user" and row.get("message"):
+                    items.append((None, row["message"]))
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                text = next((record[k] for k in TEXT_KEYS if record.get(k)), None)
+                if not text:
+                    continue
+                sender = next((str(record[k]) for k in SENDER_KEYS if record.get(k)), None)
+                items.append((sender, text))
+    return [(sender or f"load_user_{rng.randrange(users)}", text) for sender, text in items]
+
+
+# ==========================
+# STUB UPSTREAMS
+# ==========================
+class StubServer:
+    """
+    Local stand-in for OpenRouter (POST .../chat/completions) and the Graph API
+    (POST /<version>/<recipient_id>/messages), with injected latency and errors.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: int = 0, port: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = {"completions": 0, "graph": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openrouter_url(self) -> str:
+        return f"{self.base_url}/api/v1/chat/completions"
+
+    @property
+    def graph_base(self) -> str:
+        return f"{self.base_url}/v16.0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/chat/completions"):
+                    kind = "completions"
+                elif self.path.endswith("/messages"):
+                    kind = "graph"
+                else:
+                    return self._reply(404, {"error": "not found"})
+                with stub._lock:
+                    stub.calls[kind] += 1
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000.0)
+                if stub._should_fail():
+                    return self._reply(stub.error_status, {"error": "injected failure"})
+                if kind == "completions":
+                    prompt = body.get("messages", [{}])[-1].get("content", "")
+                    return self._reply(200, {
+                        "choices": [{"message": {"role": "assistant", "content": f"stub reply to: {prompt}"}}]
+                    })
+                recipient = self.path.rstrip("/").split("/")[-2]
+                return self._reply(200, {"recipient_id": recipient, "message_id": f"stub-{time.time_ns()}"})
+
+            def _reply(self, status, data):
+                raw = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# ==========================
+# IN-PROCESS APP
+# ==========================
+def spawn_app(stub: StubServer = None, db_path: str = None, port: int = 0):
+    """
+    Start app.py in a background thread (like run_local.start_server), pointed at the stubs.
+    Returns (webhook_url, shutdown_fn); shutdown_fn first waits (up to DRAIN_TIMEOUT) for
+    queued LLM replies to be delivered. Must be called before anything imports app/auth/sender.
+    """
+    if stub is not None:
+        os.environ["DEV_MODE"] = "false"
+        os.environ["IG_API_BASE"] = stub.graph_base
+        os.environ["IG_ACCESS_TOKEN"] = "stub-token"
+        os.environ["LLM_PROVIDER"] = "openrouter"
+        os.environ["OPENROUTER_API_KEY"] = "stub-key"
+        os.environ["OPENROUTER_URL"] = stub.openrouter_url
+
+    import logger
+    import scheduler
+    import shared_state
+    from werkzeug.serving import make_server
+
+    tmp_dir = tempfile.mkdtemp(prefix="loadtest-")
+    logger.DB_FILENAME = db_path or os.path.join(tmp_dir, "conversations.db")
+    shared_state.STATE_PATH = os.path.join(tmp_dir, "shared_state.db")
+    logger.init_db()
+    from app import app
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown():
+        if not scheduler.drain(DRAIN_TIMEOUT):
+            print(f"Warning: queued replies still pending after {DRAIN_TIMEOUT:.0f}s")
+        server.shutdown()
+
+    return f"http://127.0.0.1:{server.server_port}/webhook", shutdown
+
+
+# ==========================
+# LOAD DRIVER
+# ==========================
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(latencies) -> dict:
+    """Min/percentiles/max in milliseconds for a list of durations in seconds."""
+    lat_ms = sorted(l * 1000.0 for l in latencies)
+    return {
+        "min": round(lat_ms[0], 2) if lat_ms else 0.0,
+        "p50": round(percentile(lat_ms, 50), 2),
+        "p90": round(percentile(lat_ms, 90), 2),
+        "p95": round(percentile(lat_ms, 95), 2),
+        "p99": round(percentile(lat_ms, 99), 2),
+        "max": round(lat_ms[-1], 2) if lat_ms else 0.0,
+    }
+
+
+def summarize(latencies, statuses, elapsed: float, replies: Counter = None) -> dict:
+    ok = sum(1 for s in statuses if s == 200)
+    report = {
+        "requests": len(statuses),
+        "ok": ok,
+        "errors": len(statuses) - ok,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(statuses) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": latency_summary(latencies),
+    }
+    if replies is not None:
+        # Per-message send status from the webhook body: "queued" replies are delivered later
+        report["replies"] = dict(replies)
+    return report
+
+
+def run_load(url: str, corpus, concurrency: int = 4, rate: float = None,
+             total: int = None, duration: float = None) -> dict:
+    """
+    Replay `corpus` against `url`, cycling through it in order.
+    - rate=None: closed loop, `concurrency` workers send back-to-back.
+    - rate=N: open loop, one request every 1/N s on a pool of `concurrency` workers;
+      latency is measured from the scheduled send time so queueing is not hidden.
+    Stops after `total` requests or `duration` seconds (default: one pass over the corpus).
+    """
+    if not corpus:
+        raise ValueError("Corpus is empty.")
+    if total is None and duration is None:
+        total = len(corpus)
+
+    latencies, statuses = [], []
+    replies = Counter()
+    lock = threading.Lock()
+    local = threading.local()
+    counter = iter(range(total if total is not None else 2 ** 62))
+
+    def send(index, scheduled):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        sender_id, text = corpus[index % len(corpus)]
+        sent = []
+        try:
+            r = simulate_message(sender_id, text, url=url, session=local.session, verbose=False)
+            status = r.status_code
+            if status == 200:
+                sent = [item["sent"].get("status", "unknown") for item in r.json().get("responses", [])]
+        except (requests.RequestException, ValueError):
+            status = 0
+        with lock:
+            latencies.append(time.perf_counter() - scheduled)
+            statuses.append(status)
+            replies.update(sent)
+
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    if rate is None:
+        def worker():
+            while deadline is None or time.perf_counter() < deadline:
+                with lock:
+                    index = next(counter, None)
+                if index is None:
+                    return
+                send(index, time.perf_counter())
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        interval = 1.0 / rate
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index in counter:
+                scheduled = start + index * interval
+                if deadline is not None and scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, index, scheduled)
+
+    return summarize(latencies, statuses, time.perf_counter() - start, replies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a message corpus against /webhook.")
+    parser.add_argument("--corpus", required=True, help=".jsonl (text/message/body per line) or exported .csv")
+    parser.add_argument("--url", default=WEBHOOK_URL, help="Webhook URL (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Run app.py in-process against local stubs")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="Target requests/second (open loop)")
+    parser.add_argument("--requests", type=int, dest="total", help="Stop after this many requests")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--users", type=int, default=50, help="Fake users for lines without a sender id")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-error-status", type=int, default=500)
+    parser.add_argument("--db", help="SQLite file for the spawned app (default: temp file)")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus, users=args.users, seed=args.seed)
+    stub = shutdown = None
+    url = args.url
+    delivered, delivered_lock = [], threading.Lock()
+    if args.spawn:
+        stub = StubServer(args.stub_latency_ms, args.stub_error_rate, args.stub_error_status, seed=args.seed).start()
+        url, shutdown = spawn_app(stub, db_path=args.db)
+        import scheduler
+
+        def on_delivered(seconds, source):
+            with delivered_lock:
+                delivered.append((seconds, source))
+
+        scheduler.get_scheduler().on_delivered = on_delivered
+    try:
+        report = run_load(url, corpus, args.concurrency, args.rate, args.total, args.duration)
+    finally:
+        if shutdown:
+            # Drains the scheduler, so every queued reply is delivered (or given up on) first
+            shutdown()
+        if stub:
+            report_calls = dict(stub.calls)
+            stub.stop()
+    if stub:
+        report["delivered"] = {
+            "count": len(delivered),
+            "by_source": dict(Counter(source for _, source in delivered)),
+            "latency_ms": latency_summary([seconds for seconds, _ in delivered]),
+        }
+        report["upstream_calls"] = report_calls
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Zeus AI Chatbot — Conversation Logger
 • Uses SQLite for secure, local message logging
 • Thread-safe for Streamlit
 • Supports conversation history, clear, export, and long-term memory save/load
+• Stores NLU metadata per message and keeps analytics rollups up to date incrementally
 """
 
 import sqlite3
@@ -17,22 +18,35 @@ from typing import List, Tuple, Optional
 # ==========================
 # DATABASE CONFIG
 # ==========================
-DB_FILENAME = os.path.join(os.path.dirname(__file__), "conversations.db")
+DB_FILENAME = os.getenv("CONVERSATIONS_DB", os.path.join(os.path.dirname(__file__), "conversations.db"))
+
+# Confidence histogram resolution (0.0–0.1, 0.1–0.2, …, 0.9–1.0)
+CONFIDENCE_BUCKETS = 10
+
+# DB file whose schema has already been created in this process (init-once)
+_initialized_path = None
 
 # ==========================
 # SAFE CONNECTION HANDLER
 # ==========================
 def _get_conn():
-    """Create and return a thread-safe SQLite connection."""
+    """Create and return a thread-safe SQLite connection, creating the schema on first use."""
+    if _initialized_path != DB_FILENAME:
+        init_db()
     return sqlite3.connect(DB_FILENAME, check_same_thread=False)
 
 # ==========================
 # INITIALIZATION
 # ==========================
 def init_db():
-    """Create DB and messages table if they don’t exist."""
-    conn = _get_conn()
+    """Create DB and messages table if they don’t exist. Cheap no-op after the first call."""
+    global _initialized_path
+    if _initialized_path == DB_FILENAME:
+        return
+    conn = sqlite3.connect(DB_FILENAME, check_same_thread=False)
     cur = conn.cursor()
+    # WAL lets several worker processes write while others read
+    cur.execute("PRAGMA journal_mode=WAL")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS messages (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,8 +56,47 @@ def init_db():
         created_at TEXT NOT NULL
     )
     """)
+    cur.executescript(ANALYTICS_SCHEMA)
     conn.commit()
     conn.close()
+    _initialized_path = DB_FILENAME
+
+# NLU metadata (one row per user message) and rollups maintained by log_interaction.
+# Dashboards read only the rollup_* tables, whose size depends on hours × intents, not on traffic.
+ANALYTICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_nlu (
+    message_id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    entities TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    hour TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    source TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (hour, intent, source)
+);
+CREATE TABLE IF NOT EXISTS rollup_confidence (
+    hour TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    PRIMARY KEY (hour, bucket)
+);
+CREATE TABLE IF NOT EXISTS rollup_user_daily (
+    day TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    messages INTEGER NOT NULL,
+    last_at TEXT NOT NULL,
+    PRIMARY KEY (day, session_id)
+);
+-- user_activity(session_id=...) looks up one user across all days
+CREATE INDEX IF NOT EXISTS idx_rollup_user_daily_session ON rollup_user_daily (session_id, day);
+"""
 
 # ==========================
 # WRITE LOG
@@ -59,6 +112,63 @@ def log_message(session_id: str, role: str, message: str):
     conn.commit()
     conn.close()
 
+# ==========================
+# WRITE INTERACTION (webhook / console)
+# ==========================
+def log_interaction(session_id: str, user_text: str, nlu_result: Optional[dict], response_text: str,
+                    source: str = "unknown"):
+    """
+    Save one user message and the bot reply as a single conversation turn, together with
+    the NLU result and reply source ("template", "llm", "fallback"), and update the rollups.
+    """
+    now = datetime.utcnow().isoformat()
+    session_id = str(session_id or "unknown")
+    nlu_result = nlu_result or {}
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO messages (session_id, role, message, created_at) VALUES (?, ?, ?, ?)",
+        (session_id, "user", (user_text or "")[:2000], now)
+    )
+    _record_nlu(cur, cur.lastrowid, session_id, nlu_result.get("intent") or "unknown",
+                float(nlu_result.get("confidence") or 0.0), nlu_result.get("entities") or {}, source, now)
+    cur.execute(
+        "INSERT INTO messages (session_id, role, message, created_at) VALUES (?, ?, ?, ?)",
+        (session_id, "assistant", (response_text or "")[:2000], now)
+    )
+    conn.commit()
+    conn.close()
+
+def _record_nlu(cur, message_id, session_id, intent, confidence, entities, source, created_at):
+    """Store NLU metadata for one message and fold it into every rollup (same transaction)."""
+    cur.execute(
+        "INSERT INTO message_nlu (message_id, session_id, intent, confidence, entities, source, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (message_id, session_id, intent, confidence, json.dumps(entities), source, created_at)
+    )
+    _apply_rollups(cur, session_id, intent, confidence, source, created_at)
+
+def _apply_rollups(cur, session_id, intent, confidence, source, created_at):
+    hour, day = created_at[:13], created_at[:10]
+    bucket = min(int(confidence * CONFIDENCE_BUCKETS), CONFIDENCE_BUCKETS - 1)
+    cur.execute(
+        "INSERT INTO rollup_hourly (hour, intent, source, messages, confidence_sum) VALUES (?, ?, ?, 1, ?) "
+        "ON CONFLICT(hour, intent, source) DO UPDATE SET "
+        "messages = messages + 1, confidence_sum = confidence_sum + excluded.confidence_sum",
+        (hour, intent, source, confidence)
+    )
+    cur.execute(
+        "INSERT INTO rollup_confidence (hour, bucket, messages) VALUES (?, ?, 1) "
+        "ON CONFLICT(hour, bucket) DO UPDATE SET messages = messages + 1",
+        (hour, bucket)
+    )
+    cur.execute(
+        "INSERT INTO rollup_user_daily (day, session_id, messages, last_at) VALUES (?, ?, 1, ?) "
+        "ON CONFLICT(day, session_id) DO UPDATE SET "
+        "messages = messages + 1, last_at = MAX(last_at, excluded.last_at)",
+        (day, session_id, created_at)
+    )
+
 # ==========================
 # READ LOG
 # ==========================
@@ -158,3 +268,88 @@ def load_memory(session_id: str) -> (bool, str):
         return True, f"Loaded {len(history)} messages from saved memory."
     except Exception as e:
         return False, f"Error loading memory: {e}"
+
+
+# ==========================
+# ANALYTICS (reads rollups only)
+# ==========================
+def _bounds(since, until, width: int = 13) -> Tuple[str, str]:
+    """
+    Turn optional datetimes / ISO strings into inclusive key bounds, truncated to `width`
+    (13 = 'YYYY-MM-DDTHH' hour keys, 10 = day keys). "~" sorts after every key character,
+    so until="2025-01-02" includes all of that day.
+    """
+    lo = since.isoformat() if isinstance(since, datetime) else (since or "")
+    hi = until.isoformat() if isinstance(until, datetime) else (until or "9999")
+    return lo[:width], hi[:width] + "~"
+
+def _query_rollup(sql: str, params: tuple) -> list:
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def intent_distribution(since=None, until=None) -> List[Tuple[str, int, float]]:
+    """(intent, messages, average confidence), most frequent first."""
+    rows = _query_rollup(
+        "SELECT intent, SUM(messages), SUM(confidence_sum) FROM rollup_hourly "
+        "WHERE hour >= ? AND hour <= ? GROUP BY intent ORDER BY SUM(messages) DESC, intent",
+        _bounds(since, until)
+    )
+    return [(intent, n, round(conf / n, 3)) for intent, n, conf in rows]
+
+def source_breakdown(since=None, until=None) -> dict:
+    """Messages answered per reply source, e.g. {"template": 120, "llm": 30}."""
+    rows = _query_rollup(
+        "SELECT source, SUM(messages) FROM rollup_hourly WHERE hour >= ? AND hour <= ? GROUP BY source",
+        _bounds(since, until)
+    )
+    return dict(rows)
+
+def confidence_histogram(since=None, until=None) -> List[Tuple[float, int]]:
+    """(bucket lower bound, messages) for every confidence bucket, including empty ones."""
+    rows = dict(_query_rollup(
+        "SELECT bucket, SUM(messages) FROM rollup_confidence WHERE hour >= ? AND hour <= ? GROUP BY bucket",
+        _bounds(since, until)
+    ))
+    return [(b / CONFIDENCE_BUCKETS, rows.get(b, 0)) for b in range(CONFIDENCE_BUCKETS)]
+
+def hourly_activity(since=None, until=None) -> List[Tuple[str, int]]:
+    """(hour 'YYYY-MM-DDTHH', messages) in chronological order."""
+    return _query_rollup(
+        "SELECT hour, SUM(messages) FROM rollup_hourly WHERE hour >= ? AND hour <= ? GROUP BY hour ORDER BY hour",
+        _bounds(since, until)
+    )
+
+def user_activity(session_id: Optional[str] = None, since=None, until=None,
+                  limit: int = 20) -> List[Tuple[str, int, str]]:
+    """
+    Per-user activity from daily rollups.
+    With session_id: (day, messages, last_at) per day. Without: top users as (session_id, messages, last_at).
+    """
+    lo, hi = _bounds(since, until, width=10)
+    if session_id is not None:
+        return _query_rollup(
+            "SELECT day, messages, last_at FROM rollup_user_daily "
+            "WHERE session_id = ? AND day >= ? AND day <= ? ORDER BY day",
+            (session_id, lo, hi)
+        )
+    return _query_rollup(
+        "SELECT session_id, SUM(messages), MAX(last_at) FROM rollup_user_daily WHERE day >= ? AND day <= ? "
+        "GROUP BY session_id ORDER BY SUM(messages) DESC, session_id LIMIT ?",
+        (lo, hi, limit)
+    )
+
+def rebuild_rollups():
+    """Recompute every rollup from message_nlu (one-off backfill or repair; scans the full table)."""
+    conn = _get_conn()
+    cur = conn.cursor()
+    for table in ("rollup_hourly", "rollup_confidence", "rollup_user_daily"):
+        cur.execute(f"DELETE FROM {table}")
+    rows = conn.execute("SELECT session_id, intent, confidence, source, created_at FROM message_nlu")
+    for session_id, intent, confidence, source, created_at in rows:
+        _apply_rollups(cur, session_id, intent, confidence, source, created_at)
+    conn.commit()
+    conn.close()
@@ -8,9 +8,8 @@ Stores and retrieves user-specific memory files based on username.
 import os
 import json
 
-# Directory to store each user's memory file
+# Directory to store each user's memory file (created on first save, not at import)
 MEM_DIR = os.path.join(os.path.dirname(__file__), "user_memory")
-os.makedirs(MEM_DIR, exist_ok=True)
 
 def _memory_path(username: str) -> str:
     """Return the file path for this user's memory file."""
@@ -30,6 +29,7 @@ def load_user_memory(username: str) -> dict:
 
 def save_user_memory(username: str, memory_data: dict):
     """Save updated memory to disk."""
+    os.makedirs(MEM_DIR, exist_ok=True)
     path = _memory_path(username)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(memory_data, f, ensure_ascii=False, indent=2)
@@ -7,19 +7,22 @@ nlu.py
 import re
 from datetime import datetime
 
-# Simple rule-based intents and patterns
+# Simple rule-based intents and patterns, checked in order: specific intents first,
+# so "hi, help me track my order 123" is an order-status question, not a greeting/help
 INTENT_PATTERNS = {
+    "faq_order_status": [r"\b(order status|where is my order|track (my )?order)\b"],
     "greeting": [r"\bhi\b", r"\bhello\b", r"\bhey\b", r"\bgreetings\b"],
     "help": [r"\bhelp\b", r"\bsupport\b", r"\bassist\b"],
     "hours": [r"\b(open|close|hours|timings)\b"],
     "pricing": [r"\b(price|cost|fee|pricing)\b"],
-    "faq_order_status": [r"\b(order status|where is my order|track order)\b"],
 }
 
 ENTITY_PATTERNS = {
     "date": r"(\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b|\btomorrow\b|\btoday\b|\bnext week\b)",
     "email": r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)",
-    "phone": r"(\+?\d{7,15})"
+    "phone": r"(\+?\d{7,15})",
+    # Captures just the number, e.g. "track my order #12345" -> "12345"
+    "order_id": r"\border\s+(?:number\s+|no\.?\s+|id\s+)?(\d{3,})"
 }
 
 CONFIDENCE_HIGH = 0.9
@@ -45,7 +48,7 @@ def extract_entities(text: str):
     for name, pattern in ENTITY_PATTERNS.items():
         m = re.search(pattern, text)
         if m:
-            entities[name] = m.group(0)
+            entities[name] = m.group(m.lastindex or 0)
     return entities
 
 def simple_ml_fallback(text: str):
@@ -12,16 +12,21 @@ Key Features:
 
 import os
 import random
-import requests
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import llm_dispatch
+import routing
 
 # === ENVIRONMENT SETUP ===
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openrouter")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
 
 # === CONFIG ===
 MAX_TOKENS = 250
 TEMPERATURE = 0.7
 DEFAULT_MODEL = "openrouter/gpt-3.5-turbo"  # Change this to another available model if desired
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))  # seconds a caller waits for the dispatcher
 
 # === FALLBACK RESPONSES (Offline Mode) ===
 FALLBACK_IDEAS = [
@@ -37,14 +42,29 @@ FALLBACK_IDEAS = [
 
 
 # === PRIMARY LLM CALLER (OPENROUTER) ===
-import requests
-import os
+def _call_llm(prompt: str, timeout: float = None) -> str:
+    """
+    Gets a contextual reply through the shared dispatcher (llm_dispatch.py), which
+    micro-batches concurrent prompts, merges identical ones and bounds upstream concurrency.
+    `timeout` (seconds, e.g. what is left of a reply deadline) caps both the wait for a
+    request slot and the HTTP call; LLM_QUEUE_TIMEOUT applies either way.
+    """
+    timeout = LLM_QUEUE_TIMEOUT if timeout is None else min(timeout, LLM_QUEUE_TIMEOUT)
+    future = llm_dispatch.get_dispatcher(_post_completion).submit(prompt, timeout=timeout)
+    try:
+        return future.result(timeout=timeout)
+    except (FutureTimeout, TimeoutError):
+        return "(⚠️ OpenRouter error: timed out waiting for a free request slot)"
 
-# === PRIMARY LLM CALLER (OPENROUTER) ===
-def _call_llm(prompt: str) -> str:
+
+def _post_completion(prompt: str, timeout: float = None) -> str:
     """
-    Calls OpenRouter's chat-completion endpoint for contextual replies.
+    Calls OpenRouter's chat-completion endpoint for contextual replies, giving up after
+    `timeout` seconds (at most 15).
+    `requests` is imported here so template-only cold starts never load it.
     """
+    import requests
+
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "").lower()
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
@@ -71,10 +91,10 @@ def _call_llm(prompt: str) -> str:
 
     try:
         response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
+            os.getenv("OPENROUTER_URL", OPENROUTER_URL),
             headers=headers,
             json=payload,
-            timeout=15
+            timeout=15 if timeout is None else min(15, timeout)
         )
         response.raise_for_status()
         data = response.json()
@@ -103,12 +123,25 @@ def _simulate_reply(prompt: str) -> str:
     return base
 
 
+# === REPLY SOURCE (analytics / scheduling) ===
+def reply_source(nlu_data: dict = None) -> str:
+    """
+    Where generate_response will get its reply for this NLU result:
+    "template" (routing table, no network call) or "llm".
+    """
+    if nlu_data and "intent" in nlu_data:
+        if routing.render(nlu_data["intent"], nlu_data.get("entities")) is not None:
+            return "template"
+    return "llm"
+
+
 # === RESPONSE GENERATOR (MAIN LOGIC) ===
-def generate_response(user_input: str, nlu_data: dict = None) -> str:
+def generate_response(user_input: str, nlu_data: dict = None, timeout: float = None) -> str:
     """
     Generates a reply based on detected intent or LLM fallback.
     :param user_input: Raw message text from user.
     :param nlu_data: Parsed data from NLU (intent, confidence, etc.)
+    :param timeout: Seconds the LLM call may take (e.g. the rest of a reply deadline).
     """
     try:
         # Use detected intent if NLU provided
@@ -116,22 +149,17 @@ def generate_response(user_input: str, nlu_data: dict = None) -> str:
             intent = nlu_data["intent"]
             confidence = nlu_data.get("confidence", 0.0)
 
-            # Handle known intents via templates
-            if intent == "greeting":
-                return "Hey Chief 👑! How can I assist you today?"
-            elif intent == "goodbye":
-                return "Take care, Chief! 👋 See you soon."
-            elif intent == "thanks":
-                return "Always a pleasure to help, Chief 🙌"
-            elif intent == "about_bot":
-                return "I’m ChiefAI — your personal chatbot created by Shivang Suryavanshi. Ready to assist anytime."
+            # Handle known intents via the routing table (no network call)
+            reply = routing.render(intent, nlu_data.get("entities"))
+            if reply is not None:
+                return reply
 
             # If low confidence → use LLM fallback
             if confidence < 0.6:
-                return _call_llm(user_input)
+                return _call_llm(user_input, timeout=timeout)
 
         # If no NLU or fallback condition
-        return _call_llm(user_input)
+        return _call_llm(user_input, timeout=timeout)
 
     except Exception as e:
         return f"(⚠️ Error generating response: {str(e)})"
@@ -0,0 +1,110 @@
+"""
+routing.py
+- Data-driven intent -> reply routing table (reply_templates.json by default).
+- Each intent maps to one template or a list of templates, most specific first.
+  The first template whose {placeholders} are all present in the NLU entities wins,
+  e.g. "Checking order #{order_id}" is used only when extract_entities found an order_id.
+- Templates are compiled once; static replies are pre-rendered.
+- Hot-reloadable: the file's mtime is re-checked at most every ROUTING_RELOAD_INTERVAL
+  seconds, and reload() forces it. A broken file keeps the last good table.
+"""
+
+import json
+import logging
+import os
+import string
+import threading
+import time
+
+ROUTING_TABLE_PATH = os.getenv(
+    "ROUTING_TABLE_PATH", os.path.join(os.path.dirname(__file__), "reply_templates.json")
+)
+RELOAD_INTERVAL = float(os.getenv("ROUTING_RELOAD_INTERVAL", "2.0"))
+
+_formatter = string.Formatter()
+_lock = threading.Lock()
+_table = {}
+_mtime = None
+_checked_at = None
+
+
+def compile_table(raw: dict) -> dict:
+    """
+    Compile {intent: template | [templates]} into
+    {intent: [(required_fields, template, pre_rendered_or_None), ...]}.
+    Raises ValueError on malformed entries.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Routing table must be a JSON object of intent -> template(s).")
+    table = {}
+    for intent, templates in raw.items():
+        if isinstance(templates, str):
+            templates = [templates]
+        if not templates or not all(isinstance(t, str) for t in templates):
+            raise ValueError(f"Intent '{intent}' needs a template string or a list of them.")
+        variants = []
+        for template in templates:
+            fields = set()
+            for _, field, _, _ in _formatter.parse(template):
+                if field is None:
+                    continue
+                if not field.isidentifier():
+                    raise ValueError(f"Intent '{intent}': placeholder '{{{field}}}' must be an entity name.")
+                fields.add(field)
+            static = template.format() if not fields else None
+            variants.append((frozenset(fields), template, static))
+        table[intent] = variants
+    return table
+
+
+def load_table(path: str = None) -> dict:
+    """Read and compile a routing table file."""
+    with open(path or ROUTING_TABLE_PATH, "r", encoding="utf-8") as f:
+        return compile_table(json.load(f))
+
+
+def reload(force: bool = True) -> dict:
+    """
+    Re-read the routing table if its mtime changed (or always, with force=True).
+    On errors the previous table stays active.
+    """
+    global _table, _mtime, _checked_at
+    with _lock:
+        _checked_at = time.monotonic()
+        try:
+            mtime = os.stat(ROUTING_TABLE_PATH).st_mtime_ns
+        except OSError as e:
+            logging.warning(f"Routing table unavailable: {e}")
+            return _table
+        if not force and mtime == _mtime:
+            return _table
+        try:
+            _table = load_table(ROUTING_TABLE_PATH)
+            _mtime = mtime
+        except (OSError, ValueError) as e:
+            logging.error(f"Routing table not reloaded, keeping previous version: {e}")
+        return _table
+
+
+def get_table() -> dict:
+    """Return the active table, checking the file for changes at most every RELOAD_INTERVAL s."""
+    if _checked_at is None or time.monotonic() - _checked_at >= RELOAD_INTERVAL:
+        return reload(force=False)
+    return _table
+
+
+def render(intent: str, entities: dict = None):
+    """
+    Return the templated reply for `intent`, or None if the table can't answer it
+    (unknown intent, or no variant whose placeholders are all available).
+    """
+    variants = get_table().get(intent)
+    if not variants:
+        return None
+    entities = entities or {}
+    for fields, template, static in variants:
+        if static is not None:
+            return static
+        if fields.issubset(entities):
+            return template.format_map(entities)
+    return None
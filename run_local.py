@@ -11,18 +11,19 @@ import time
 import json
 import os
 
-from app import app  # Flask app
-from auth import DEV_MODE
-
 def start_server():
-    # Start Flask app (debug mode is set in app.py)
+    # Start Flask app (debug mode is set in app.py); imported here so that
+    # loadtest.py can reuse simulate_message without pulling in the app.
+    from app import app
     app.run(port=5000)
 
-def simulate_message(sender_id="test_user_1", text="Hi, what are your hours?"):
+WEBHOOK_URL = "http://127.0.0.1:5000/webhook"
+
+def build_payload(sender_id, text):
     """
-    Sends a simulated webhook-like payload to /webhook so you can test flow without IG.
+    Builds a webhook-like payload carrying a single IG message.
     """
-    payload = {
+    return {
         "entry": [
             {
                 "messaging": [
@@ -31,11 +32,21 @@ def simulate_message(sender_id="test_user_1", text="Hi, what are your hours?"):
             }
         ]
     }
-    r = requests.post("http://127.0.0.1:5000/webhook", json=payload)
-    try:
-        print("Simulate response:", r.status_code, r.json())
-    except Exception:
-        print("Simulate response text:", r.text)
+
+def simulate_message(sender_id="test_user_1", text="Hi, what are your hours?", url=WEBHOOK_URL,
+                     session=None, verbose=True):
+    """
+    Sends a simulated webhook-like payload to /webhook so you can test flow without IG.
+    Returns the HTTP response so callers (e.g. loadtest.py) can inspect it.
+    """
+    post = session.post if session is not None else requests.post
+    r = post(url, json=build_payload(sender_id, text), timeout=30)
+    if verbose:
+        try:
+            print("Simulate response:", r.status_code, r.json())
+        except Exception:
+            print("Simulate response text:", r.text)
+    return r
 
 if __name__ == "__main__":
     # Start Flask server in a thread to allow simulation in same process (useful in PyCharm)
@@ -0,0 +1,227 @@
+"""
+scheduler.py
+- Cost- and deadline-aware scheduling of replies for app.webhook.
+- Each message is classified with responder.reply_source (NLU intent + extracted entities):
+    * "template" replies run inline on the fast lane: no queue, no network, microseconds.
+    * "llm" replies go to a separate bounded lane (LLM_LANE_WORKERS threads,
+      at most LLM_LANE_MAX_PENDING queued or running).
+- Every message carries a deadline (REPLY_DEADLINE_MS). When the LLM lane is full, its
+  predicted wait exceeds the deadline, or the call overruns it, the reply degrades to
+  responder._simulate_reply and is reported with source "fallback".
+- Callers either block on ScheduledReply.result() or use deliver_when_done(), which runs the
+  log + send step on a separate delivery pool once the reply settles (on completion or at the
+  deadline), so it holds neither a request thread nor an LLM-lane slot.
+- drain() waits for queued LLM work and pending deliveries, e.g. before a worker exits.
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_dispatch
+import responder
+
+REPLY_DEADLINE_MS = float(os.getenv("REPLY_DEADLINE_MS", "10000"))
+LLM_LANE_WORKERS = int(os.getenv("LLM_LANE_WORKERS", "8"))
+LLM_LANE_MAX_PENDING = int(os.getenv("LLM_LANE_MAX_PENDING", "32"))
+REPLY_DELIVERY_WORKERS = int(os.getenv("REPLY_DELIVERY_WORKERS", "4"))
+
+# Weight of the newest sample in the LLM latency moving average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class ScheduledReply:
+    """
+    Handle for one scheduled message. It settles exactly once, to (reply_text, source):
+    when the LLM lane finishes, or with the offline reply once the deadline passes.
+    """
+
+    def __init__(self, text: str, deadline: float, reply: str = None, source: str = None, future=None):
+        self.text = text
+        self.deadline = deadline
+        self.source = source
+        self._reply = reply
+        self._future = future
+        self._lock = threading.Lock()
+        self._settled = threading.Event()
+        self._callbacks = []
+        self._timer = None
+        if future is None:
+            self._settled.set()
+        else:
+            future.add_done_callback(self._on_future_done)
+
+    def done(self) -> bool:
+        return self._settled.is_set()
+
+    def result(self):
+        """Return (reply_text, source), never waiting past the deadline."""
+        if not self._settled.wait(max(0.0, self.deadline - time.monotonic())):
+            self._expire()
+        return self._reply, self.source
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(reply_text, source) once the reply settles: immediately if it already has,
+        otherwise from the lane thread, or from a timer at the deadline.
+        """
+        with self._lock:
+            if not self._settled.is_set():
+                self._callbacks.append(fn)
+                if self._timer is None:
+                    self._timer = threading.Timer(max(0.0, self.deadline - time.monotonic()), self._expire)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        fn(self._reply, self.source)
+
+    def _on_future_done(self, future):
+        if future.cancelled() or future.exception() is not None:
+            self._expire()
+        else:
+            self._settle(*future.result())
+
+    def _expire(self):
+        if self._settle(responder._simulate_reply(self.text), "fallback"):
+            self._future.cancel()
+
+    def _settle(self, reply: str, source: str) -> bool:
+        with self._lock:
+            if self._settled.is_set():
+                return False
+            self._reply, self.source = reply, source
+            self._settled.set()
+            callbacks, self._callbacks = self._callbacks, []
+            if self._timer is not None:
+                self._timer.cancel()
+        for fn in callbacks:
+            fn(reply, source)
+        return True
+
+
+class ReplyScheduler:
+    """Fast inline lane for template replies plus a bounded, deadline-aware LLM lane."""
+
+    def __init__(self, workers: int = LLM_LANE_WORKERS, max_pending: int = LLM_LANE_MAX_PENDING,
+                 deadline_ms: float = REPLY_DEADLINE_MS, delivery_workers: int = REPLY_DELIVERY_WORKERS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.deadline_ms = deadline_ms
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-lane")
+        self._delivery_pool = ThreadPoolExecutor(max_workers=delivery_workers, thread_name_prefix="reply-delivery")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0     # LLM-lane jobs queued or running
+        self._deliveries = 0  # deliver_when_done callbacks not finished yet
+        self._latency = None  # EWMA of LLM lane call time, seconds
+        self.stats = {"template": 0, "llm": 0, "shed": 0, "delivered": 0}  # "shed": degraded at admission
+        # Optional hook, called as on_delivered(seconds_since_submit, source) (used by loadtest.py)
+        self.on_delivered = None
+
+    def submit(self, text: str, nlu_result: dict, deadline_ms: float = None) -> ScheduledReply:
+        deadline = time.monotonic() + (self.deadline_ms if deadline_ms is None else deadline_ms) / 1000.0
+
+        if responder.reply_source(nlu_result) == "template":
+            with self._lock:
+                self.stats["template"] += 1
+            return ScheduledReply(text, deadline, responder.generate_response(text, nlu_result), "template")
+
+        with self._lock:
+            if not self._admit(deadline):
+                self.stats["shed"] += 1
+                return ScheduledReply(text, deadline, responder._simulate_reply(text), "fallback")
+            self._pending += 1
+            self.stats["llm"] += 1
+        future = self._pool.submit(self._run_llm, text, nlu_result, deadline)
+        # Created first so the reply settles before the lane slot is released
+        reply = ScheduledReply(text, deadline, future=future)
+        future.add_done_callback(self._release)
+        return reply
+
+    def deliver_when_done(self, job: ScheduledReply, deliver):
+        """
+        Run deliver(reply_text, source) on the delivery pool once `job` settles. Slow logging
+        or Graph API sends then never occupy an LLM-lane thread, and drain() waits for them.
+        """
+        submitted = time.monotonic()
+        with self._lock:
+            self._deliveries += 1
+        job.add_done_callback(
+            lambda reply, source: self._delivery_pool.submit(self._run_delivery, deliver, reply, source, submitted)
+        )
+
+    def _run_delivery(self, deliver, reply: str, source: str, submitted: float):
+        try:
+            deliver(reply, source)
+        finally:
+            with self._lock:
+                self._deliveries -= 1
+                self.stats["delivered"] += 1
+                self._idle.notify_all()
+            if self.on_delivered is not None:
+                self.on_delivered(time.monotonic() - submitted, source)
+
+    def _admit(self, deadline: float) -> bool:
+        """Lane has room and (once we have latency data) the predicted finish beats the deadline."""
+        if self._pending >= self.max_pending:
+            return False
+        if self._latency is None:
+            return True
+        # Upstream calls are capped by the dispatcher as well as by the lane's own threads
+        parallel = max(1, min(self.workers, llm_dispatch.MAX_CONCURRENCY))
+        waves = math.ceil((self._pending + 1) / parallel)
+        return time.monotonic() + waves * self._latency <= deadline
+
+    def _run_llm(self, text: str, nlu_result: dict, deadline: float):
+        """Return (reply_text, source) for one LLM-lane message."""
+        started = time.monotonic()
+        if started >= deadline:
+            # Started too late: nobody is waiting for the LLM answer anymore
+            return responder._simulate_reply(text), "fallback"
+        # The LLM call only gets what is left of the deadline, so late work frees its slot
+        reply = responder.generate_response(text, nlu_result, timeout=deadline - started)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._latency = elapsed if self._latency is None else (
+                LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * self._latency
+            )
+        return reply, "llm"
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self._idle.notify_all()
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until queued LLM work and pending deliveries are finished. False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0 and self._deliveries == 0, timeout)
+
+    def shutdown(self):
+        """Drop queued LLM work and wait for running calls and deliveries to finish."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._delivery_pool.shutdown(wait=True)
+
+
+_scheduler = None
+_scheduler_pid = None
+_lock = threading.Lock()
+
+
+def get_scheduler() -> ReplyScheduler:
+    """Return this process's scheduler, creating it on first use (never shared across a fork)."""
+    global _scheduler, _scheduler_pid
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        with _lock:
+            if _scheduler is None or _scheduler_pid != os.getpid():
+                _scheduler, _scheduler_pid = ReplyScheduler(), os.getpid()
+    return _scheduler
+
+
+def drain(timeout: float = None) -> bool:
+    """Drain this process's scheduler, if it was ever created (see gunicorn.conf.py worker_exit)."""
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        return True
+    return _scheduler.drain(timeout)
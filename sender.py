@@ -4,12 +4,16 @@ sender.py
 - In DEV_MODE, responses are simulated and not sent to IG.
 """
 
-import requests
+import os
 import time
 from auth import IG_ACCESS_TOKEN, DEV_MODE
 import logging
+import shared_state
 
-IG_API_BASE = "https://graph.facebook.com/v16.0"
+IG_API_BASE = os.getenv("IG_API_BASE", "https://graph.facebook.com/v16.0")
+
+# Shared across workers: once one worker is rate limited, all of them hold off
+RATE_LIMIT_KEY = "sender:rate_limited_until"
 
 def _exponential_backoff(attempt):
     return min(60, (2 ** attempt))
@@ -23,19 +27,26 @@ def send_instagram_message(recipient_id: str, message_text: str) -> dict:
         # Simulate a success response for local testing
         return {"status": "simulated", "to": recipient_id, "message": message_text}
 
+    import requests  # only needed outside DEV_MODE; keeps cold start light
+
     url = f"{IG_API_BASE}/{recipient_id}/messages"
     headers = {"Authorization": f"Bearer {IG_ACCESS_TOKEN}"}
     payload = {"message": {"text": message_text}}
 
     for attempt in range(5):
+        cooldown = shared_state.get(RATE_LIMIT_KEY, 0) - time.time()
+        if cooldown > 0:
+            logging.warning(f"Rate limit cool-down in effect. Sleeping {cooldown:.1f}s")
+            time.sleep(cooldown)
         try:
             r = requests.post(url, json=payload, headers=headers, timeout=10)
             if r.status_code == 200:
                 return {"status": "sent", "result": r.json()}
             elif r.status_code == 429:
                 backoff = _exponential_backoff(attempt)
-                logging.warning(f"Rate limited. Sleeping {backoff}s")
-                time.sleep(backoff)
+                logging.warning(f"Rate limited. Backing off {backoff}s")
+                until = max(shared_state.get(RATE_LIMIT_KEY, 0), time.time() + backoff)
+                shared_state.set(RATE_LIMIT_KEY, until, ttl=until - time.time())
                 continue
             else:
                 logging.error(f"Send failed: {r.status_code} {r.text}")
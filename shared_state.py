@@ -0,0 +1,99 @@
+"""
+shared_state.py
+- Small cross-process key/value store backed by SQLite (WAL mode), so state that must be
+  shared between prefork workers (see gunicorn.conf.py) doesn't live in module globals.
+- Every key has a TTL. Used for webhook de-duplication and the Graph API rate-limit
+  cool-down; get/set are there for caches and breaker flags.
+- Connections are per thread and per process, so they are never shared across a fork.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_PATH = os.getenv("SHARED_STATE_PATH", os.path.join(os.path.dirname(__file__), "shared_state.db"))
+
+# Expired rows are purged every PURGE_EVERY writes from a given process
+PURGE_EVERY = 1000
+
+_local = threading.local()
+_writes = 0
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+
+
+def init():
+    """
+    Create the store and its schema, then close the connection. Safe to call in a preloading
+    master (e.g. from app.warmup): no connection is left open to be inherited by forked workers.
+    """
+    conn = sqlite3.connect(STATE_PATH, timeout=10)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _get_conn():
+    """Return this thread's connection, reopening it after a fork or a STATE_PATH change."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.path != STATE_PATH:
+        # Autocommit: every statement below is a single atomic write
+        conn = sqlite3.connect(STATE_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        _local.conn, _local.pid, _local.path = conn, os.getpid(), STATE_PATH
+    return conn
+
+
+def _after_write(conn):
+    global _writes
+    _writes += 1
+    if _writes % PURGE_EVERY == 0:
+        conn.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+
+
+def add_if_absent(key: str, ttl: float, value=True) -> bool:
+    """
+    Atomically claim `key` for `ttl` seconds. Returns True for exactly one caller
+    across all processes until the key expires (e.g. de-duplicating webhook retries).
+    """
+    now = time.time()
+    conn = _get_conn()
+    cur = conn.execute(
+        "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+        "WHERE kv.expires_at <= ?",
+        (key, json.dumps(value), now + ttl, now),
+    )
+    _after_write(conn)
+    return cur.rowcount == 1
+
+
+def set(key: str, value, ttl: float):
+    """Store a JSON-serializable value for `ttl` seconds, replacing any previous one."""
+    conn = _get_conn()
+    conn.execute(
+        "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+        (key, json.dumps(value), time.time() + ttl),
+    )
+    _after_write(conn)
+
+
+def get(key: str, default=None):
+    """Return the live value for `key`, or `default` if missing or expired."""
+    row = _get_conn().execute(
+        "SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+    ).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def delete(key: str):
+    """Remove `key` immediately."""
+    _get_conn().execute("DELETE FROM kv WHERE key = ?", (key,))
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import logger
 import memory_manager
 
@@ -158,3 +158,35 @@ else:
                 st.experimental_rerun()
             else:
                 st.info("Logged out — please refresh manually.")
+
+    # ==========================================
+    # STEP 7: Conversation Analytics (reads rollup tables only)
+    # ==========================================
+    st.markdown("---")
+    if st.checkbox("📊 Show conversation analytics"):
+        st.subheader("📊 Conversation Analytics")
+        window = st.selectbox("Time window", ["Last 24 hours", "Last 7 days", "Last 30 days", "All time"])
+        days = {"Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30}.get(window)
+        since = datetime.utcnow() - timedelta(days=days) if days else None
+
+        sources = logger.source_breakdown(since)
+        total = sum(sources.values())
+        if not total:
+            st.info("No analyzed messages in this window yet.")
+        else:
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Messages", total)
+            m2.metric("Template replies", f"{sources.get('template', 0) / total:.0%}")
+            m3.metric("LLM replies", f"{sources.get('llm', 0) / total:.0%}")
+
+            st.caption("Intent distribution")
+            st.bar_chart({"messages": {intent: n for intent, n, _ in logger.intent_distribution(since)}})
+            st.caption("Confidence histogram")
+            st.bar_chart({"messages": {f"{lo:.1f}": n for lo, n in logger.confidence_histogram(since)}})
+            st.caption("Messages per hour (UTC)")
+            st.line_chart({"messages": dict(logger.hourly_activity(since))})
+            st.caption("Most active users")
+            st.table([
+                {"user": user, "messages": n, "last seen": last}
+                for user, n, last in logger.user_activity(since=since)
+            ])
@@ -0,0 +1,62 @@
+"""
+Shared pytest fixtures: a real gunicorn server (gunicorn.conf.py + wsgi:app) for
+multi-worker / HTTP-level tests
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def gunicorn_server(tmp_path):
+    """
+    Return start(**env), which boots gunicorn on a free port with DEV_MODE on, shared state and
+    conversations in tmp_path, plus the given env overrides, and returns its base URL once
+    /health answers. Every server started is stopped with SIGTERM at teardown.
+    """
+    pytest.importorskip("gunicorn")
+    requests = pytest.importorskip("requests")
+    servers = []
+
+    def start(**env) -> str:
+        port = free_port()
+        env = {
+            **os.environ,
+            "GUNICORN_BIND": f"127.0.0.1:{port}",
+            "DEV_MODE": "true",
+            "SHARED_STATE_PATH": str(tmp_path / "shared_state.db"),
+            "CONVERSATIONS_DB": str(tmp_path / "conversations.db"),
+            **env,
+        }
+        servers.append(subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        base = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 20
+        while True:
+            try:
+                requests.get(f"{base}/health", timeout=1)
+                return base
+            except requests.ConnectionError:
+                assert time.time() < deadline, "gunicorn did not start"
+                time.sleep(0.2)
+
+    yield start
+    for server in servers:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
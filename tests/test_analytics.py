@@ -0,0 +1,77 @@
+"""
+pytest tests for NLU metadata logging and analytics rollups in logger
+"""
+
+import pytest
+
+import logger
+from nlu import parse_message
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger, "DB_FILENAME", str(tmp_path / "conversations.db"))
+
+
+def _log(session_id, text, source):
+    logger.log_interaction(session_id, text, parse_message(text), "reply", source=source)
+
+
+def _rollups():
+    return (
+        logger.intent_distribution(),
+        logger.source_breakdown(),
+        logger.confidence_histogram(),
+        logger.hourly_activity(),
+        logger.user_activity(),
+    )
+
+
+def test_log_interaction_stores_nlu_and_updates_rollups(db):
+    _log("alice", "Hello", "template")
+    _log("alice", "What are your hours?", "template")
+    _log("bob", "Tell me something fun", "llm")
+    _log("bob", "Hi again", "template")
+
+    assert logger.intent_distribution()[0] == ("greeting", 2, 0.9)
+    assert logger.source_breakdown() == {"template": 3, "llm": 1}
+    histogram = dict(logger.confidence_histogram())
+    assert histogram[0.9] == 3 and histogram[0.3] == 1 and sum(histogram.values()) == 4
+    assert sum(n for _, n in logger.hourly_activity()) == 4
+    assert [(user, n) for user, n, _ in logger.user_activity()] == [("alice", 2), ("bob", 2)]
+    assert len(logger.get_history("alice")) == 4
+
+
+def test_queries_read_rollups_only_and_rebuild_matches(db):
+    for i in range(5):
+        _log(f"user{i % 2}", "track my order 12345" if i % 2 else "pricing?", "template")
+    incremental = _rollups()
+
+    logger.rebuild_rollups()
+    assert _rollups() == incremental
+
+    conn = logger._get_conn()
+    conn.execute("DELETE FROM message_nlu")
+    conn.commit()
+    conn.close()
+    assert _rollups() == incremental
+
+
+def test_time_window_bounds(db):
+    _log("carol", "Hello", "template")
+    (hour, _), = logger.hourly_activity()
+    day = hour[:10]
+    assert logger.source_breakdown(since=day, until=day) == {"template": 1}
+    assert logger.source_breakdown(until="2000-01-01") == {}
+    assert logger.user_activity("carol", since=day)[0][:2] == (day, 1)
+
+
+def test_per_user_activity_uses_session_index(db):
+    _log("dave", "Hello", "template")
+    conn = logger._get_conn()
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT day, messages, last_at FROM rollup_user_daily "
+        "WHERE session_id = ? AND day >= ? AND day <= ? ORDER BY day", ("dave", "", "9999~")
+    ))
+    conn.close()
+    assert "idx_rollup_user_daily_session" in plan
@@ -0,0 +1,71 @@
+"""
+pytest-benchmark micro-benchmarks for hot paths (nlu, logger, memory_manager).
+Save a baseline with `pytest tests/test_benchmarks.py --benchmark-autosave` and gate
+deploys with `--benchmark-compare --benchmark-compare-fail=mean:20%`.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import logger
+import memory_manager
+import routing
+from nlu import parse_message
+
+MESSAGES = [
+    "Hey there!",
+    "What are your hours tomorrow?",
+    "How much does the premium plan cost?",
+    "Where is my order, I placed it on 12/10/2025",
+    "Can you email me at chief@example.com or call +919876543210",
+    "Tell me something interesting about the ocean",
+]
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger, "DB_FILENAME", str(tmp_path / "conversations.db"))
+    logger.init_db()
+
+
+@pytest.fixture
+def tmp_mem_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_manager, "MEM_DIR", str(tmp_path))
+
+
+def test_bench_parse_message(benchmark):
+    results = benchmark(lambda: [parse_message(m) for m in MESSAGES])
+    assert results[0]["intent"] == "greeting"
+
+
+def test_bench_routing_render(benchmark):
+    entities = {"order_id": "12345"}
+    reply = benchmark(routing.render, "faq_order_status", entities)
+    assert "12345" in reply
+
+
+def test_bench_log_message(benchmark, tmp_db):
+    benchmark(logger.log_message, "bench_user", "user", "What are your hours?")
+
+
+def test_bench_log_interaction(benchmark, tmp_db):
+    nlu_result = parse_message("What are your hours?")
+    benchmark(logger.log_interaction, "bench_user", "What are your hours?", nlu_result, "We're open 9-5.")
+
+
+def test_bench_get_history(benchmark, tmp_db):
+    for i in range(200):
+        logger.log_message("bench_user", "user" if i % 2 else "assistant", f"message {i}")
+    rows = benchmark(logger.get_history, "bench_user", 50)
+    assert len(rows) == 50
+
+
+def test_bench_user_memory_roundtrip(benchmark, tmp_mem_dir):
+    memory = {"last_message": "hi", "last_reply": "hey Chief", "conversation_count": 42}
+
+    def roundtrip():
+        memory_manager.save_user_memory("Bench User", memory)
+        return memory_manager.load_user_memory("Bench User")
+
+    assert benchmark(roundtrip) == memory
@@ -0,0 +1,122 @@
+"""
+pytest tests for llm_dispatch (micro-batching, single-flight, bounded concurrency)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_dispatch
+from llm_dispatch import LLMDispatcher
+
+
+def test_identical_concurrent_prompts_share_one_call():
+    calls = []
+
+    def fake_llm(prompt, timeout=None):
+        calls.append(prompt)
+        time.sleep(0.05)
+        return f"reply to {prompt}"
+
+    dispatcher = LLMDispatcher(fake_llm, window_ms=5, max_concurrency=4)
+    futures = [dispatcher.submit("what should I cook?") for _ in range(20)]
+    assert {f.result(timeout=5) for f in futures} == {"reply to what should I cook?"}
+    assert calls == ["what should I cook?"]
+    assert dispatcher.stats["deduplicated"] == 19
+
+
+def test_distinct_prompts_respect_concurrency_cap():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_llm(prompt, timeout=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return prompt.upper()
+
+    dispatcher = LLMDispatcher(fake_llm, window_ms=2, max_concurrency=2)
+    prompts = [f"prompt {i}" for i in range(10)]
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda p: dispatcher.submit(p).result(timeout=5), prompts))
+    assert results == [p.upper() for p in prompts]
+    assert peak[0] <= 2
+    assert dispatcher.stats["upstream_calls"] == 10
+
+
+def test_errors_reach_every_caller_and_prompt_can_retry():
+    attempts = []
+
+    def flaky_llm(prompt, timeout=None):
+        attempts.append(prompt)
+        if len(attempts) == 1:
+            time.sleep(0.02)
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    dispatcher = LLMDispatcher(flaky_llm, window_ms=1, max_concurrency=1)
+    first, second = dispatcher.submit("hi?"), dispatcher.submit("hi?")
+    for f in (first, second):
+        with pytest.raises(RuntimeError):
+            f.result(timeout=5)
+    assert dispatcher.submit("hi?").result(timeout=5) == "ok"
+
+
+def test_call_gets_time_left_and_expired_prompts_skip_upstream():
+    seen = []
+    release = threading.Event()
+
+    def fake_llm(prompt, timeout=None):
+        seen.append((prompt, timeout))
+        release.wait(1)  # hold the only slot
+        return prompt
+
+    dispatcher = LLMDispatcher(fake_llm, window_ms=1, max_concurrency=1)
+    first = dispatcher.submit("first", timeout=2)
+    late = dispatcher.submit("late", timeout=0.05)
+    time.sleep(0.1)
+    release.set()
+    assert first.result(timeout=5) == "first"
+    assert isinstance(late.exception(timeout=5), TimeoutError)
+    assert [prompt for prompt, _ in seen] == ["first"]
+    assert 1.5 < seen[0][1] <= 2
+    assert dispatcher.stats["upstream_calls"] == 1 and dispatcher.stats["expired"] == 1
+
+
+def test_get_dispatcher_rejects_a_different_call(monkeypatch):
+    monkeypatch.setattr(llm_dispatch, "_dispatcher", None)
+
+    def first(prompt):
+        return "first"
+
+    def second(prompt):
+        return "second"
+
+    assert llm_dispatch.get_dispatcher(first) is llm_dispatch.get_dispatcher(first)
+    with pytest.raises(ValueError):
+        llm_dispatch.get_dispatcher(second)
+
+
+def test_responder_against_fake_completions_server(monkeypatch):
+    pytest.importorskip("requests")
+    import responder
+    from loadtest import StubServer
+
+    with StubServer(latency_ms=50) as stub:
+        monkeypatch.setenv("LLM_PROVIDER", "openrouter")
+        monkeypatch.setenv("OPENROUTER_API_KEY", "stub-key")
+        monkeypatch.setenv("OPENROUTER_URL", stub.openrouter_url)
+        monkeypatch.setattr(llm_dispatch, "_dispatcher", None)
+
+        prompts = ["tell me a joke"] * 8 + ["tell me a story"] * 8
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            replies = list(pool.map(responder._call_llm, prompts))
+
+        assert replies[0] == "stub reply to: tell me a joke"
+        assert replies[-1] == "stub reply to: tell me a story"
+        assert stub.calls["completions"] == 2
@@ -0,0 +1,56 @@
+"""
+pytest unit tests for loadtest (corpus loading, stub upstreams, percentiles)
+"""
+
+import json
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from loadtest import StubServer, load_corpus, percentile, summarize
+
+
+def test_load_corpus_jsonl_is_reproducible(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text(
+        json.dumps({"text": "Hello"}) + "\n\n"
+        + json.dumps({"sender_id": "u1", "message": "Pricing?"}) + "\n"
+        + json.dumps({"other": "ignored"}) + "\n",
+        encoding="utf-8",
+    )
+    corpus = load_corpus(str(path), seed=7)
+    assert [text for _, text in corpus] == ["Hello", "Pricing?"]
+    assert corpus[1][0] == "u1"
+    assert corpus == load_corpus(str(path), seed=7)
+
+
+def test_load_corpus_exported_csv(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(
+        "id,role,message,created_at\n1,user,Hi,t\n2,assistant,Hey Chief,t\n3,user,Hours?,t\n",
+        encoding="utf-8",
+    )
+    assert [text for _, text in load_corpus(str(path))] == ["Hi", "Hours?"]
+
+
+def test_percentiles():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    report = summarize([0.01, 0.02], [200, 500], elapsed=1.0)
+    assert report["ok"] == 1 and report["errors"] == 1
+    assert report["latency_ms"]["max"] == 20.0
+
+
+def test_stub_server_latency_and_errors():
+    with StubServer(error_rate=1.0, error_status=429) as stub:
+        r = requests.post(stub.openrouter_url, json={"messages": [{"role": "user", "content": "x"}]})
+        assert r.status_code == 429
+    with StubServer() as stub:
+        r = requests.post(stub.openrouter_url, json={"messages": [{"role": "user", "content": "x"}]})
+        assert r.json()["choices"][0]["message"]["content"] == "stub reply to: x"
+        r = requests.post(f"{stub.graph_base}/123/messages", json={"message": {"text": "hi"}})
+        assert r.json()["recipient_id"] == "123"
+        assert stub.calls == {"completions": 1, "graph": 1}
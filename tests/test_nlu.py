@@ -16,3 +16,14 @@ def test_hours_intent():
 def test_entity_date():
     r = parse_message("I need support on 12/10/2025")
     assert "date" in r["entities"]
+
+def test_order_status_entity_order_id():
+    r = parse_message("I want to track my order #12345")
+    assert r["intent"] == "faq_order_status"
+    assert r["entities"]["order_id"] == "12345"
+
+
+def test_order_status_wins_over_help():
+    r = parse_message("help me track my order 12345")
+    assert r["intent"] == "faq_order_status"
+    assert r["entities"]["order_id"] == "12345"
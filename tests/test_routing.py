@@ -0,0 +1,69 @@
+"""
+pytest unit tests for routing (intent -> templated replies)
+"""
+
+import json
+import os
+
+import pytest
+
+import routing
+from nlu import parse_message
+
+
+@pytest.fixture
+def table_file(tmp_path, monkeypatch):
+    path = tmp_path / "reply_templates.json"
+    monkeypatch.setattr(routing, "ROUTING_TABLE_PATH", str(path))
+    monkeypatch.setattr(routing, "RELOAD_INTERVAL", 0.0)
+    monkeypatch.setattr(routing, "_table", {})
+    monkeypatch.setattr(routing, "_mtime", None)
+    monkeypatch.setattr(routing, "_checked_at", None)
+
+    def write(data):
+        path.write_text(json.dumps(data), encoding="utf-8")
+        # Make sure the mtime moves even on coarse filesystem clocks
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    return write
+
+
+def test_default_table_covers_nlu_intents():
+    for text in ["Hello", "What are your hours?", "How much does it cost?", "Where is my order"]:
+        r = parse_message(text)
+        assert routing.render(r["intent"], r["entities"]), text
+    assert routing.render("unknown", {}) is None
+
+
+def test_entity_substitution_picks_most_specific_variant(table_file):
+    table_file({"faq_order_status": ["Checking order #{order_id}", "Which order?"]})
+    r = parse_message("track my order 98765")
+    assert routing.render(r["intent"], r["entities"]) == "Checking order #98765"
+    assert routing.render("faq_order_status", {}) == "Which order?"
+
+
+def test_static_replies_are_prerendered():
+    table = routing.compile_table({"greeting": "Hi {{Chief}}"})
+    (fields, _, static), = table["greeting"]
+    assert not fields and static == "Hi {Chief}"
+
+
+def test_hot_reload_and_bad_file_keeps_last_good_table(table_file):
+    table_file({"greeting": "v1"})
+    assert routing.render("greeting") == "v1"
+    table_file({"greeting": "v2"})
+    assert routing.render("greeting") == "v2"
+    table_file({"greeting": "{0}"})
+    assert routing.render("greeting") == "v2"
+
+
+def test_generate_response_uses_table_without_llm(monkeypatch):
+    import responder
+
+    def no_llm(prompt, timeout=None):
+        raise AssertionError("LLM must not be called for templated intents")
+
+    monkeypatch.setattr(responder, "_call_llm", no_llm)
+    r = parse_message("help me track my order 12345")
+    assert "#12345" in responder.generate_response("help me track my order 12345", r)
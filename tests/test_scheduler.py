@@ -0,0 +1,203 @@
+"""
+pytest tests for scheduler (fast template lane, bounded LLM lane, deadlines)
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import llm_dispatch
+import responder
+from loadtest import StubServer
+from nlu import parse_message
+from scheduler import ReplyScheduler
+
+# The real dispatcher-backed call, before any fixture patches it
+call_llm = responder._call_llm
+
+
+@pytest.fixture
+def slow_llm(monkeypatch):
+    """Make every LLM-bound reply block until released (or 2 s pass)."""
+    release = threading.Event()
+    monkeypatch.setattr(responder, "_call_llm", lambda prompt, timeout=None: release.wait(2) and f"llm: {prompt}")
+    monkeypatch.setattr(responder, "_simulate_reply", lambda prompt: f"offline: {prompt}")
+    yield release
+    release.set()
+
+
+@pytest.fixture
+def make_scheduler(slow_llm):
+    """Build schedulers whose lanes are drained before the LLM patch is undone."""
+    schedulers = []
+
+    def make(**kwargs):
+        schedulers.append(ReplyScheduler(**kwargs))
+        return schedulers[-1]
+
+    yield make
+    slow_llm.set()
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def test_template_replies_stay_fast_under_llm_backlog(make_scheduler):
+    scheduler = make_scheduler(workers=2, max_pending=50, deadline_ms=5000)
+    backlog = [scheduler.submit(f"tell me a story {i}", parse_message(f"tell me a story {i}")) for i in range(20)]
+
+    started = time.perf_counter()
+    reply, source = scheduler.submit("Hello", parse_message("Hello")).result()
+    assert time.perf_counter() - started < 0.01
+    assert source == "template" and reply.startswith("Hey Chief")
+    assert not any(job.done() for job in backlog)
+
+
+def test_llm_reply_within_deadline(slow_llm, make_scheduler):
+    scheduler = make_scheduler(workers=1, max_pending=4, deadline_ms=2000)
+    job = scheduler.submit("tell me a joke", parse_message("tell me a joke"))
+    slow_llm.set()
+    assert job.result() == ("llm: tell me a joke", "llm")
+
+
+def test_missed_deadline_degrades_to_simulated_reply(make_scheduler):
+    scheduler = make_scheduler(workers=1, max_pending=4, deadline_ms=50)
+    started = time.perf_counter()
+    assert scheduler.submit("tell me a joke", parse_message("tell me a joke")).result() == (
+        "offline: tell me a joke", "fallback"
+    )
+    assert time.perf_counter() - started < 0.5
+
+
+def test_full_llm_lane_sheds_immediately(make_scheduler):
+    scheduler = make_scheduler(workers=1, max_pending=2, deadline_ms=5000)
+    for i in range(2):
+        scheduler.submit(f"question {i}", parse_message(f"question {i}"))
+    job = scheduler.submit("one more", parse_message("one more"))
+    assert job.done()
+    assert job.result() == ("offline: one more", "fallback")
+    assert scheduler.stats == {"template": 0, "llm": 2, "shed": 1, "delivered": 0}
+
+
+def test_predicted_miss_is_shed_before_queueing(make_scheduler):
+    scheduler = make_scheduler(workers=1, max_pending=10, deadline_ms=100)
+    scheduler._latency = 1.0  # lane is known to take ~1 s per call
+    job = scheduler.submit("tell me a joke", parse_message("tell me a joke"))
+    assert job.done() and job.result()[1] == "fallback"
+
+
+def test_late_started_job_is_reported_as_fallback(make_scheduler, monkeypatch):
+    def llm_300ms(prompt, timeout=None):
+        time.sleep(0.3)
+        return f"llm: {prompt}"
+
+    monkeypatch.setattr(responder, "_call_llm", llm_300ms)
+    scheduler = make_scheduler(workers=1, max_pending=4, deadline_ms=200)
+    a = scheduler.submit("why is the sky blue", parse_message("why is the sky blue"))
+    b = scheduler.submit("why sky blue", parse_message("why sky blue"))
+    assert a.result()[1] == "fallback"
+    time.sleep(0.35)  # b starts on the lane only after its deadline has passed
+    assert b.result() == ("offline: why sky blue", "fallback")
+
+
+def test_deadline_bounds_the_upstream_call(make_scheduler, monkeypatch):
+    timeouts = []
+
+    def slow_upstream(prompt, timeout=None):
+        timeouts.append(timeout)
+        time.sleep(min(timeout or 5, 5))  # like requests honouring its timeout
+        return f"llm: {prompt}"
+
+    monkeypatch.setattr(llm_dispatch, "_dispatcher", None)
+    monkeypatch.setattr(responder, "_post_completion", slow_upstream)
+    monkeypatch.setattr(responder, "_call_llm", call_llm)
+    scheduler = make_scheduler(workers=1, max_pending=4, deadline_ms=200)
+
+    started = time.perf_counter()
+    assert scheduler.submit("tell me a joke", parse_message("tell me a joke")).result()[1] == "fallback"
+    # The lane (and dispatcher) slot is free right after the deadline, not after 5 s
+    assert scheduler.drain(timeout=1)
+    assert time.perf_counter() - started < 0.6
+    assert 0 < timeouts[0] <= 0.2
+
+
+def test_done_callback_fires_once_on_completion_or_deadline(slow_llm, make_scheduler):
+    scheduler = make_scheduler(workers=2, max_pending=4, deadline_ms=300)
+    fast, late = [], []
+    ready = threading.Event()
+    job = scheduler.submit("tell me a joke", parse_message("tell me a joke"))
+    job.add_done_callback(lambda reply, source: fast.append((reply, source)))
+    expiring = scheduler.submit("tell me a story", parse_message("tell me a story"), deadline_ms=50)
+    expiring.add_done_callback(lambda reply, source: late.append((reply, source)) or ready.set())
+
+    assert ready.wait(1)
+    assert late == [("offline: tell me a story", "fallback")]
+    slow_llm.set()
+    assert job.result() == ("llm: tell me a joke", "llm")
+    time.sleep(0.05)
+    assert fast == [("llm: tell me a joke", "llm")] and len(late) == 1
+
+
+def test_slow_delivery_does_not_hold_the_llm_lane(slow_llm, make_scheduler):
+    scheduler = make_scheduler(workers=1, max_pending=2, deadline_ms=500)
+    slow_llm.set()
+    sending, sent = threading.Event(), threading.Event()
+
+    def slow_send(reply, source):
+        sending.set()
+        sent.wait(2)
+
+    first = scheduler.submit("tell me a joke", parse_message("tell me a joke"))
+    scheduler.deliver_when_done(first, slow_send)
+    assert sending.wait(1)
+
+    # The only lane thread is free while the first reply is still being sent
+    second = scheduler.submit("tell me a story", parse_message("tell me a story"))
+    assert second.result() == ("llm: tell me a story", "llm")
+    assert scheduler.stats["shed"] == 0
+
+    assert not scheduler.drain(timeout=0.05)
+    sent.set()
+    assert scheduler.drain(timeout=1)
+    assert scheduler.stats["delivered"] == 1
+
+
+def test_http_template_reply_not_blocked_by_llm_requests(gunicorn_server, tmp_path):
+    """Under gunicorn with 1 worker x 2 threads, slow LLM requests must not hold the HTTP threads."""
+    with StubServer(latency_ms=1500) as stub:
+        base = gunicorn_server(
+            WEB_CONCURRENCY="1",
+            GUNICORN_THREADS="2",
+            LLM_PROVIDER="openrouter",
+            OPENROUTER_API_KEY="stub-key",
+            OPENROUTER_URL=stub.openrouter_url,
+        )
+
+        def post(text):
+            payload = {"entry": [{"messaging": [{"sender": {"id": "u1"}, "message": {"text": text}}]}]}
+            started = time.perf_counter()
+            body = requests.post(f"{base}/webhook", json=payload, timeout=10).json()
+            return time.perf_counter() - started, body["responses"][0]["sent"]["status"]
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            slow = [pool.submit(post, f"tell me story number {i}") for i in range(4)]
+            time.sleep(0.2)
+            greeting_latency, greeting_status = pool.submit(post, "Hello").result()
+            slow_results = [f.result() for f in slow]
+
+        assert greeting_status == "simulated"
+        assert greeting_latency < 0.5
+        assert all(status == "queued" and latency < 1.0 for latency, status in slow_results)
+
+        # The LLM replies are still logged and sent once the lane finishes
+        deadline = time.time() + 10
+        while True:
+            with sqlite3.connect(tmp_path / "conversations.db") as conn:
+                llm = conn.execute("SELECT COUNT(*) FROM message_nlu WHERE source = 'llm'").fetchone()[0]
+            if llm == 4 or time.time() > deadline:
+                break
+            time.sleep(0.2)
+        assert llm == 4
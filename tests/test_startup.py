@@ -0,0 +1,70 @@
+"""
+pytest cold-start tests: import-time budget and deferred initialization
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import logger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for importing app.py itself, on top of Flask (whose cost we don't control)
+APP_IMPORT_BUDGET_MS = 50
+
+
+def _run(code: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "STARTUP_MODE": "lazy"},
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_core_modules_import_without_side_effects():
+    result = _run(
+        "import json, os, sys\n"
+        "made = []\n"
+        "os.makedirs = lambda *a, **k: made.append(a)\n"
+        "import nlu, routing, logger, memory_manager, responder\n"
+        "print(json.dumps({'requests': 'requests' in sys.modules, 'makedirs': made}))\n"
+    )
+    assert result == {"requests": False, "makedirs": []}
+
+
+def test_app_import_time_budget():
+    pytest.importorskip("flask")
+    code = (
+        "import json, sys, time\n"
+        "import flask\n"
+        "t = time.perf_counter()\n"
+        "import app\n"
+        "ms = (time.perf_counter() - t) * 1000\n"
+        "lazy = [m for m in ('requests', 'responder', 'sender', 'logger') if m in sys.modules]\n"
+        "print(json.dumps({'ms': ms, 'loaded': lazy}))\n"
+    )
+    # Take the best of a few runs to keep the check stable on noisy machines
+    results = [_run(code) for _ in range(3)]
+    assert results[0]["loaded"] == []
+    assert min(r["ms"] for r in results) < APP_IMPORT_BUDGET_MS
+
+
+def test_init_db_runs_once_per_db_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger, "DB_FILENAME", str(tmp_path / "a.db"))
+    monkeypatch.setattr(logger, "_initialized_path", None)
+    calls = []
+    real_connect = logger.sqlite3.connect
+    monkeypatch.setattr(logger.sqlite3, "connect", lambda *a, **k: calls.append(a) or real_connect(*a, **k))
+
+    logger.init_db()
+    logger.init_db()
+    logger.log_message("u", "user", "hi")
+    assert len(calls) == 2  # one schema setup + one write
+
+    monkeypatch.setattr(logger, "DB_FILENAME", str(tmp_path / "b.db"))
+    logger.log_message("u", "user", "hi")
+    assert logger.get_history("u")[0][2] == "hi"
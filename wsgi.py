@@ -0,0 +1,9 @@
+"""
+wsgi.py
+- Production entry point for the Flask app under a prefork server.
+- Run with: gunicorn -c gunicorn.conf.py wsgi:app   (settings documented in gunicorn.conf.py)
+"""
+
+from app import app, warmup
+
+__all__ = ["app", "warmup"]